@@ -1,10 +1,221 @@
 from __future__ import annotations
 
 import os
+import re
+import mmap
 import itertools
-import pandas as pd
+import threading
+import numpy as np
+
+from typing import Iterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    import _fasta_kernels  # optional compiled kernels, see _fasta_kernels.pyx
+except ImportError:
+    _fasta_kernels = None
+
+try:
+    import numba  # optional, used to compute the column mask of big alignments on all cores
+except ImportError:
+    numba = None
+
+# file extensions of fasta files, compared with the lower case path
+FASTA_EXTENSIONS = ('.fa', '.fasta')
+
+# matches every header line of a fasta file, the group is the header without the leading '>'
+# a '>' can only start a header line, so the pattern needs no '^' anchor and the scan can jump from '>' to '>'
+HEADER_PATTERN = re.compile(rb'>([^\n]*)')
+
+# translation table that replaces the spaces in a header, further forbidden characters can be added to it
+HEADER_TRANSLATION = bytes.maketrans(b' ', b'_')
+
+# byte values of the residues that make a column unusable, computed once so that the kernels can use them as constants
+GAP_BYTE = ord('-')  # 45
+STOP_BYTE = ord('*')  # 42
+UNKNOWN_BYTE = ord('X')  # 88
+UNUSABLE_RESIDUES = np.array([GAP_BYTE, STOP_BYTE, UNKNOWN_BYTE], dtype=np.uint8)
+
+# the 20 amino acids get the codes 0 to 19 in the dense encoding of the residues
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+UNUSABLE_CODE = 20  # code of all unusable residues ('-', '*', 'X')
+OTHER_CODE = 21  # code of all other characters, e.g. the '?' given by MEGAN
+NUM_CODES = OTHER_CODE + 1
+
+# lookup table that maps every ascii byte to its dense code
+RESIDUE_CODES = np.full(256, OTHER_CODE, dtype=np.uint8)
+RESIDUE_CODES[np.frombuffer(AMINO_ACIDS.encode('ascii'), dtype=np.uint8)] = np.arange(len(AMINO_ACIDS))
+RESIDUE_CODES[UNUSABLE_RESIDUES] = UNUSABLE_CODE
+
+# the codes fit into 5 bits, so 12 residues are packed into one 64 bit word
+BITS_PER_RESIDUE = 5
+RESIDUES_PER_WORD = 64 // BITS_PER_RESIDUE
+LANE_SHIFTS = np.arange(RESIDUES_PER_WORD, dtype=np.uint64) * np.uint64(BITS_PER_RESIDUE)
+LANE_MASK = np.uint64(0b11111)
+
+# words that hold the same value in every lane, used to compare all 12 lanes of a word at once
+LANE_LOW_BITS = np.uint64(sum(0b01111 << shift for shift in range(0, 60, BITS_PER_RESIDUE)))
+LANE_HIGH_BITS = np.uint64(sum(0b10000 << shift for shift in range(0, 60, BITS_PER_RESIDUE)))
+UNUSABLE_WORD = np.uint64(sum(UNUSABLE_CODE << shift for shift in range(0, 60, BITS_PER_RESIDUE)))
+
+# number of residues per line in the written fasta files
+LINE_WIDTH = 60
+NEWLINE_BYTE = ord('\n')
+
+# number of residues from which on the column mask is computed in parallel
+PARALLEL_MASK_THRESHOLD = 10_000_000
+
+# number of columns that are handled together by one thread of the parallel kernel
+PARALLEL_MASK_BLOCK = 4096
+
+
+if numba is not None:
+    @numba.njit(parallel=True, nogil=True, boundscheck=False, cache=True)
+    def _parallel_usable_column_mask(seq_matrix: np.ndarray) -> np.ndarray:
+        """
+        Numba kernel that computes the usable column mask on all cores. The columns are split into blocks that are
+        handled by different threads, inside of a block the rows are read contiguously. The GIL is released while the
+        kernel runs.
+        """
+        num_rows, num_columns = seq_matrix.shape
+        keep_columns = np.ones(num_columns, dtype=np.bool_)
+        num_blocks = (num_columns + PARALLEL_MASK_BLOCK - 1) // PARALLEL_MASK_BLOCK
+
+        for block in numba.prange(num_blocks):
+            start = block * PARALLEL_MASK_BLOCK
+            stop = min(start + PARALLEL_MASK_BLOCK, num_columns)
+
+            for i in range(num_rows):
+                for j in range(start, stop):
+                    residue = seq_matrix[i, j]
+                    if residue == GAP_BYTE or residue == STOP_BYTE or residue == UNKNOWN_BYTE:
+                        keep_columns[j] = False
+
+        return keep_columns
+
+
+def usable_column_mask(seq_matrix: np.ndarray) -> np.ndarray:
+    """
+    Function that computes which columns of an alignment contain no unusable residues ('-', '*' or 'X'). Big alignments
+    are handled by a parallel numba kernel if numba is installed. Otherwise the compiled kernel from _fasta_kernels.pyx
+    is used if it is available, and as a last resort the mask is computed with numpy.
+
+    The parallel kernel is only called from the main thread. Its threading layer (e.g. numba's workqueue) may not
+    support being entered from several threads at once and terminates the process in that case.
+
+    Parameters
+    ----------
+    seq_matrix : np.ndarray
+        The (num_of_sequences x seq_length) uint8 matrix of the alignment.
+
+    Returns
+    -------
+    A boolean array that is True for every column that should be kept.
+    """
 
-from Bio import AlignIO
+    in_main_thread = threading.current_thread() is threading.main_thread()
+
+    if numba is not None and seq_matrix.size > PARALLEL_MASK_THRESHOLD and in_main_thread:
+        return _parallel_usable_column_mask(seq_matrix)
+
+    if _fasta_kernels is not None:
+        return _fasta_kernels.usable_column_mask(np.ascontiguousarray(seq_matrix))
+
+    return ~np.isin(seq_matrix, UNUSABLE_RESIDUES).any(axis=0)
+
+
+def encode_residues(seq_matrix: np.ndarray) -> np.ndarray:
+    """
+    Function that maps the ascii matrix of an alignment to the dense residue codes. The amino acids get the codes 0 to
+    19 in the order of AMINO_ACIDS, unusable residues get UNUSABLE_CODE and all other characters get OTHER_CODE.
+
+    Parameters
+    ----------
+    seq_matrix : np.ndarray
+        The (num_of_sequences x seq_length) uint8 matrix of the alignment.
+
+    Returns
+    -------
+    The uint8 matrix of the residue codes, with the same shape as the given matrix.
+    """
+
+    return RESIDUE_CODES[seq_matrix]
+
+
+def pack_residues(codes: np.ndarray) -> np.ndarray:
+    """
+    Function that packs the residue codes of an alignment into 5 bit lanes, 12 residues per 64 bit word. The packed
+    alignment needs only 2/3 of the memory of the byte matrix, so kernels that are limited by the memory bandwidth
+    (e.g. the counting of residue pairs) have to move less data. The last word of a row is padded with zeros.
+
+    Parameters
+    ----------
+    codes : np.ndarray
+        The (num_of_sequences x seq_length) matrix of the residue codes, see encode_residues().
+
+    Returns
+    -------
+    The (num_of_sequences x ceil(seq_length / 12)) uint64 matrix of the packed residues.
+    """
+
+    num_rows, num_columns = codes.shape
+    num_words = -(-num_columns // RESIDUES_PER_WORD)
+
+    lanes = np.zeros((num_rows, num_words * RESIDUES_PER_WORD), dtype=np.uint64)
+    lanes[:, :num_columns] = codes
+
+    # shift every residue to its lane and combine the 12 lanes of each word
+    lanes = lanes.reshape(num_rows, num_words, RESIDUES_PER_WORD) << LANE_SHIFTS
+    return np.bitwise_or.reduce(lanes, axis=2)
+
+
+def unpack_residues(packed: np.ndarray, seq_length: int) -> np.ndarray:
+    """
+    Function that reverses pack_residues().
+
+    Parameters
+    ----------
+    packed : np.ndarray
+        The uint64 matrix of the packed residues.
+    seq_length : int
+        The number of residues per sequence, needed to strip the padding of the last word.
+
+    Returns
+    -------
+    The (num_of_sequences x seq_length) uint8 matrix of the residue codes.
+    """
+
+    lanes = (packed[:, :, np.newaxis] >> LANE_SHIFTS) & LANE_MASK
+    return lanes.reshape(packed.shape[0], -1)[:, :seq_length].astype(np.uint8)
+
+
+def packed_usable_column_mask(packed: np.ndarray, seq_length: int) -> np.ndarray:
+    """
+    Function that computes the usable column mask directly on the packed residues. All 12 lanes of a word are compared
+    with UNUSABLE_CODE at once: after the xor with UNUSABLE_WORD exactly the unusable lanes are zero, and adding the low
+    four bits of every lane to LANE_LOW_BITS sets the high bit of every lane that is not zero. No carry can cross a lane
+    border, so the test is exact.
+
+    Parameters
+    ----------
+    packed : np.ndarray
+        The uint64 matrix of the packed residues, see pack_residues().
+    seq_length : int
+        The number of residues per sequence.
+
+    Returns
+    -------
+    A boolean array that is True for every column that should be kept.
+    """
+
+    difference = packed ^ UNUSABLE_WORD
+    not_zero = ((difference & LANE_LOW_BITS) + LANE_LOW_BITS) | difference
+
+    # the high bit of a lane is set if any sequence has an unusable residue in the respective column
+    unusable = np.bitwise_or.reduce(~not_zero & LANE_HIGH_BITS, axis=0)
+
+    lanes = (unusable[:, np.newaxis] >> (LANE_SHIFTS + np.uint64(BITS_PER_RESIDUE - 1))) & np.uint64(1)
+    return lanes.reshape(-1)[:seq_length] == 0
 
 
 def calulate_identity(align: AlignmentFasta) -> int:
@@ -12,6 +223,10 @@ def calulate_identity(align: AlignmentFasta) -> int:
     Function that calculates the identity of sequences in file
     Identical residues divided by length of alignment multiplied by amount of pairs
 
+    The length of the alignment is align.seq_length, which is not updated when the unusable columns are deleted. So
+    after the deletion the identical residues of the remaining columns are divided by the original length, like it was
+    done before the alignment was stored as a matrix, which keeps the identities in the generated filenames unchanged.
+
     Parameters
     ----------
     align : AlignmentFasta
@@ -22,17 +237,11 @@ def calulate_identity(align: AlignmentFasta) -> int:
     Identity of sequences as round(int)
     """
 
-    seqs = []
     identical_residues = 0
     num_of_pairs = 0
 
-    for values in align.sequences.values(): #get all sequences of file
-        seqs.append(values)
-
-    for i in itertools.combinations(seqs,2): #find all pairwise combinations
-        for j in range(len(i[0])):
-            if i[0][j] == i[1][j]: #if same residue in row
-                identical_residues += 1
+    for i in itertools.combinations(align.matrix, 2): #find all pairwise combinations of the sequences
+        identical_residues += np.count_nonzero(i[0] == i[1]) #count the same residues in row
         num_of_pairs += 1
 
     id_num = (identical_residues / (align.seq_length * num_of_pairs)) * 100 #calulate identity
@@ -40,48 +249,228 @@ def calulate_identity(align: AlignmentFasta) -> int:
     return round(id_num)
 
 
+def count_residue_pairs(align: AlignmentFasta) -> np.ndarray:
+    """
+    Function that counts how often every pair of amino acids occurs in the same column of the alignment. Only the
+    usable columns are counted.
+
+    The counts are computed from the column histogram instead of the sequences: for two different amino acids a and b
+    a column with h_a and h_b occurrences contributes h_a * h_b pairs, so summed over all columns the counts are the
+    matrix product H @ H.T. Pairs of the same amino acid contribute h_a * (h_a - 1) / 2, which replaces the diagonal.
+
+    Parameters
+    ----------
+    align : AlignmentFasta
+        The alignment whose residue pairs are counted.
+
+    Returns
+    -------
+    The symmetric (20 x 20) int64 matrix of the pair counts, the order of the amino acids is AMINO_ACIDS.
+    """
+
+    # float64 is used to get a BLAS matrix product, the counts are still exact up to 2^53
+    histogram = align.column_histogram[:len(AMINO_ACIDS), align.keep_columns].astype(np.float64)
+
+    pairs = histogram @ histogram.T
+    np.fill_diagonal(pairs, (histogram * (histogram - 1) / 2).sum(axis=1))
+
+    return np.rint(pairs).astype(np.int64)
+
+
 class AlignmentFasta:
 
-    def __init__(self, sequences: dict) -> None:
+    def __init__(self, sequences: dict = None, ids: list[str] = None, matrix: np.ndarray = None) -> None:
         """
         Initializer for the an alignment that is imported/ exported as a fasta file.
 
+        The alignment is stored as one contiguous byte matrix, where every row is a sequence. It can either be given as
+        a dictionary of sequences, which is converted once, or directly as the ids and the matrix.
+
         Parameters
         ----------
         sequences : dict
             The dictionary that contains the sequences of the alignment. The key is the header of the fasta file and the
              value is the sequence, it may contain gaps and other characters that are given by MEGAN.
+        ids : list[str]
+            The headers of the sequences, only used if no sequences dictionary is given.
+        matrix : np.ndarray
+            The (num_of_sequences x seq_length) uint8 matrix of the ascii encoded sequences, only used if no sequences
+            dictionary is given.
         """
-        self.sequences = sequences
-        self.seq_length = len(list(sequences.values())[0])
-        self.num_of_sequences = len(sequences)
+        if sequences is not None:
+            # without a sequence there is no length the other sequences could be compared to
+            if not sequences:
+                raise ValueError('The alignment does not contain any sequences.')
 
-    @staticmethod
-    def __fix_header_spaces(path: str) -> None:
+            ids = list(sequences)
+
+            # all sequences must have the length of the first one, otherwise the residues would be shifted between rows
+            seq_length = len(next(iter(sequences.values())))
+            if not all(len(seq) == seq_length for seq in sequences.values()):
+                raise ValueError('The sequences of the alignment do not all have the same length.')
+
+            matrix = np.frombuffer(''.join(sequences.values()).encode('ascii'), dtype=np.uint8)
+            matrix = matrix.reshape(len(ids), seq_length)
+
+        elif ids is None or matrix is None:
+            raise ValueError('Either the sequences or the ids and the matrix of the alignment have to be given.')
+
+        self.ids = ids
+        self.matrix = matrix  # also determines the usable columns, see the matrix setter
+        self.seq_length = matrix.shape[1]
+        self.num_of_sequences = matrix.shape[0]
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """
+        The (num_of_sequences x seq_length) uint8 matrix of the ascii encoded sequences.
+
+        Returns
+        -------
+        The matrix of the alignment.
+        """
+        return self.__matrix
+
+    @matrix.setter
+    def matrix(self, matrix: np.ndarray) -> None:
         """
-        This private function replaces all spaces that are in the header string. This needs to be done, because
-        otherwise the function AlignIO.read() from the Biopython package will read in the header until the first space
-        is encountered. This may lead to conflicting header/ keys for the alignment dictionary.
+        Setter for the matrix of the alignment. The usable columns are determined once here and reused by the column
+        deletion, the dictionary view and the column histogram are rebuilt when they are requested the next time.
+
+        Only these three are kept in sync with the matrix. seq_length and num_of_sequences keep the values of the
+        initializer (see calulate_identity()) and the number of rows is not checked against the ids, that is done by
+        validate().
 
         Parameters
         ----------
-        path : str
-            Path to the fasta file that will be modified.
+        matrix : np.ndarray
+            The new (num_of_sequences x seq_length) uint8 matrix of the ascii encoded sequences.
 
         Returns
         -------
         None
         """
-        # get all lines from the file
-        with open(path, 'r') as file:
-            lines = file.readlines()
+        self.__matrix = matrix
+        self.__keep_columns = usable_column_mask(matrix)
+
+        self.__sequences = None  # dictionary view of the matrix, only built if it is requested
+        self.__column_histogram = None  # residue counts per column, only built if they are requested
+
+    @property
+    def keep_columns(self) -> np.ndarray:
+        """
+        The columns of the matrix that contain no unusable residues ('-', '*' or 'X'), see usable_column_mask().
+
+        Returns
+        -------
+        A boolean array that is True for every column that should be kept.
+        """
+        return self.__keep_columns
+
+    def validate(self) -> None:
+        """
+        Function that checks that the ids and the matrix of the alignment are consistent. The checks are not done in
+        the initializer, so that trusted alignments (e.g. from read_file()) do not have to pay for them. That all
+        sequences of a given dictionary have the same length is already checked by the initializer.
+
+        The alignment is consistent, if the matrix is a two dimensional uint8 matrix and if there is exactly one unique
+        id for every row of the matrix.
+
+        Returns
+        -------
+        None
+        """
+        if not (isinstance(self.matrix, np.ndarray) and self.matrix.ndim == 2 and self.matrix.dtype == np.uint8):
+            raise ValueError('The sequences of the alignment do not form a two dimensional uint8 matrix.')
+
+        if len(self.ids) != self.matrix.shape[0]:
+            raise ValueError(f'The alignment has {len(self.ids)} ids, but {self.matrix.shape[0]} sequences.')
+
+        if len(set(self.ids)) != len(self.ids):
+            raise ValueError('The ids of the alignment are not unique.')
+
+    @property
+    def sequences(self) -> dict:
+        """
+        The sequences of the alignment as a dictionary, where the key is the header and the value is the sequence. The
+        dictionary is built from the matrix the first time it is requested. Changes to the dictionary do not change the
+        alignment.
+
+        Returns
+        -------
+        The dictionary that contains the sequences of the alignment.
+        """
+        if self.__sequences is None:
+            self.__sequences = {header: row.tobytes().decode('ascii') for header, row in zip(self.ids, self.matrix)}
+
+        return self.__sequences
+
+    @property
+    def column_histogram(self) -> np.ndarray:
+        """
+        The number of occurrences of every residue code (see encode_residues()) in every column of the alignment. The
+        histogram is built in a single sweep over the matrix the first time it is requested and is kept up to date by
+        the column deletion, so downstream counting routines never have to go over the sequences again.
 
-        # replace spaces in the header, the sequence lines will not be modified
-        lines = [line.replace(' ', '_') if line.startswith('>') else line for line in lines]
+        Returns
+        -------
+        The (NUM_CODES x seq_length) uint32 matrix of the residue counts per column.
+        """
+        if self.__column_histogram is None:
+            histogram = np.zeros((NUM_CODES, self.matrix.shape[1]), dtype=np.uint32)
+            columns = np.arange(self.matrix.shape[1])
+
+            # every sequence adds one count to the code of its residue in each column
+            for codes in encode_residues(self.matrix):
+                histogram[codes, columns] += 1
+
+            self.__column_histogram = histogram
+
+        return self.__column_histogram
+
+    def packed_residues(self) -> np.ndarray:
+        """
+        Function that returns the residues of the alignment in the packed 5 bit encoding, see pack_residues(). This is
+        the compact representation for downstream kernels like the counting of residue pairs.
+
+        Returns
+        -------
+        The (num_of_sequences x ceil(seq_length / 12)) uint64 matrix of the packed residues.
+        """
+
+        return pack_residues(encode_residues(self.matrix))
+
+    @staticmethod
+    def __parse_fasta(data: bytes | mmap.mmap) -> Iterator[tuple[str, bytes]]:
+        """
+        This private function parses the content of a fasta file and yields every record as a pair of header and
+        sequence. The header lines are found with one scan of a compiled pattern over the buffer, so the non-header
+        bytes are never decoded or split into Python line objects. All spaces in the header are replaced by
+        underscores, so that the whole header is used as the id of the sequence. Otherwise headers that only differ
+        after the first space may lead to conflicting header/ keys for the alignment dictionary. The file itself will
+        not be modified.
 
-        # write lines to the file
-        with open(path, 'w') as file:
-            file.writelines(lines)
+        Parameters
+        ----------
+        data : bytes | mmap.mmap
+            The content of the fasta file, e.g. a read-only memory map of the file.
+
+        Returns
+        -------
+        An iterator over the (header, sequence) pairs of the fasta file. The headers are decoded as UTF-8, like a file
+        read in text mode, the sequences stay ascii encoded.
+        """
+        # a single scan of the compiled pattern finds all header lines of the file
+        headers = list(HEADER_PATTERN.finditer(data))
+
+        for index, match in enumerate(headers):
+            # the record ends where the next header line starts
+            stop = headers[index + 1].start() if index + 1 < len(headers) else len(data)
+
+            header = match.group(1).rstrip().translate(HEADER_TRANSLATION).decode('utf-8')
+
+            # the sequence of a record may be split over multiple lines
+            yield header, b''.join(data[match.end():stop].split())
 
     @staticmethod
     def read_file(path: str) -> AlignmentFasta:
@@ -102,33 +491,109 @@ class AlignmentFasta:
         -------
         An AlignmentFasta instance that contains the read alignment data.
         """
-        assert path.endswith('.fa') or path.endswith('.fasta'), 'Cannot read a non Fasta file.'
+        if not path.lower().endswith(FASTA_EXTENSIONS):
+            raise ValueError(f'Cannot read a non Fasta file: {path}')
 
-        # replace the spaces in the header to get more precise ids
-        AlignmentFasta.__fix_header_spaces(path)
+        # the file is memory mapped, so it is parsed directly from the page cache without copying it into a buffer first
+        with open(path, 'rb') as file:
 
-        AlignmentFasta.__preformat_fasta_file(path)
+            # an empty file can not be memory mapped, its (empty) content is rejected like the one of iter_directory()
+            if os.fstat(file.fileno()).st_size == 0:
+                return AlignmentFasta.__from_fasta_content(b'', path)
 
-        with open(path, 'r') as file:
-            # use of Biopython's implementation, because it is more efficient
-            alignment = AlignIO.read(file, 'fasta')
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return AlignmentFasta.__from_fasta_content(data, path)
 
-            sequences_dict = {}
+    @staticmethod
+    def __from_fasta_content(data: bytes | mmap.mmap, path: str) -> AlignmentFasta:
+        """
+        Private function that generates an AlignmentFasta instance from the content of a fasta file.
 
-            # iterate over each line of the alignment object and add it to our dictionary
-            for record in alignment:
-                sequences_dict[record.id] = str(record.seq)
+        Parameters
+        ----------
+        data : bytes | mmap.mmap
+            The content of the fasta file.
+        path : str
+            The path of the fasta file, only used in the error message.
 
-        return AlignmentFasta(sequences_dict)  # generate and return an instance of AlignmentFasta
+        Returns
+        -------
+        An AlignmentFasta instance that contains the alignment data of the given content.
+        """
+
+        # the headers are read in with their spaces replaced to get more precise ids
+        sequences_dict = dict(AlignmentFasta.__parse_fasta(data))
+
+        # an empty file or a file without header lines contains no alignment
+        if not sequences_dict:
+            raise ValueError(f'The fasta file contains no sequences: {path}')
+
+        sequences_dict = AlignmentFasta.__cut_fluttered_ends(sequences_dict)
+
+        # the sequences are still ascii encoded, so they can be stacked into the byte matrix without a conversion
+        matrix = np.frombuffer(b''.join(sequences_dict.values()), dtype=np.uint8).reshape(len(sequences_dict), -1)
+
+        return AlignmentFasta(ids=list(sequences_dict), matrix=matrix)  # generate and return an AlignmentFasta instance
 
     @staticmethod
-    def read_directory(path: str) -> list[AlignmentFasta]:
+    def __read_bytes(path: str) -> bytes:
         """
-        Function to read in multiple fasta files in a directory. Internally just reads in every file individually. Other
-        file types that are in the directory are skipped.
+        Private function that reads the whole content of a file with a single read call.
+
+        Parameters
+        ----------
+        path : str
+            The path for the file that will be read.
 
-        Note:   If we encounter bigger directories, we need to implement a iterator because otherwise we will encounter
-                issues with memory.
+        Returns
+        -------
+        The content of the file.
+        """
+
+        with open(path, 'rb') as file:
+            return file.read()
+
+    @staticmethod
+    def __iter_fasta_paths(path: str) -> Iterator[str]:
+        """
+        Private function that yields the paths of all fasta files in the given directory. Other file types that are in
+        the directory are skipped.
+
+        Parameters
+        ----------
+        path : str
+            Path to a directory that contains the fasta files. It can include other files.
+
+        Returns
+        -------
+        An iterator over the paths of all fasta files in the given directory.
+        """
+
+        # assure that path is a directory
+        if not os.path.isdir(path):
+            raise NotADirectoryError(f'Path is not a directory: {path}')
+
+        # scandir already knows the type of every entry, so no extra stat call is needed for the filtering
+        with os.scandir(path) as entries:
+            for entry in entries:
+
+                # if the entry is not a fasta file, skip it
+                if not (entry.is_file() and entry.name.lower().endswith(FASTA_EXTENSIONS)):
+                    continue
+
+                yield entry.path
+
+    @staticmethod
+    def iter_directory(path: str) -> Iterator[AlignmentFasta]:
+        """
+        Function to lazily read in multiple fasta files in a directory. The files are read in one after another, so
+        only the alignment that is currently worked on (and the content of the next file) is kept in memory. Other file
+        types that are in the directory are skipped.
+
+        Recommended use:
+
+        for alignment in AlignmentFasta.iter_directory([path_to_directory]):
+            ...
 
         Parameters
         ----------
@@ -137,34 +602,52 @@ class AlignmentFasta:
 
         Returns
         -------
-        A list of AlignmentFasta instances for each fasta file that is in the given directory.
+        An iterator that yields an AlignmentFasta instance for each fasta file that is in the given directory.
         """
 
-        assert os.path.isdir(path), 'Path is not a directory'  # assure that path is a directory
+        '''
+        While an alignment is worked on, the next file is already read by a background thread. This way the disk reads
+        overlap with the processing, but at most two files are kept in memory at once.
+        '''
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending_path, pending_read = None, None
 
-        align_list = []
+            # read the fasta files one after another and yield the respective alignment
+            for filepath in AlignmentFasta.__iter_fasta_paths(path):
+                next_read = executor.submit(AlignmentFasta.__read_bytes, filepath)
 
-        # iterate over all files in the directory and append the respective alignment to a list
-        for filename in os.listdir(path):
+                if pending_read is not None:
+                    yield AlignmentFasta.__from_fasta_content(pending_read.result(), pending_path)
 
-            # if the file is not a fasta file, skip it
-            if not (filename.endswith('.fa') or filename.endswith('.fasta')):
-                continue
+                pending_path, pending_read = filepath, next_read
 
-            '''
-            Preprocess the file so that all included sequences have the same length. This needs to be done, because 
-            MEGAN generates Alignments with 'flutter edges', which we will just cut off.
-            '''
+            if pending_read is not None:
+                yield AlignmentFasta.__from_fasta_content(pending_read.result(), pending_path)
 
-            align_list.append(AlignmentFasta.read_file(f'{path}\\{filename}'))
+    @staticmethod
+    def read_directory(path: str) -> list[AlignmentFasta]:
+        """
+        Function to read in multiple fasta files in a directory. Internally just reads in every file individually. Other
+        file types that are in the directory are skipped.
 
-        return align_list
+        Note:   All alignments are kept in memory at once. For bigger directories use iter_directory() instead.
+
+        Parameters
+        ----------
+        path : str
+            Path to a directory that contains the fasta files we want to read in. It can include other files.
+
+        Returns
+        -------
+        A list of AlignmentFasta instances for each fasta file that is in the given directory.
+        """
+
+        return list(AlignmentFasta.iter_directory(path))
 
     @staticmethod
-    def __preformat_fasta_file(filepath: str):
+    def __cut_fluttered_ends(sequences: dict) -> dict:
         """
-        Private function that preformats the given fasta file so that it can be read by the functions from the Biopython
-        package.
+        Private function that cuts all sequences of an alignment to the same length.
 
         Generally, this means, to cut of the fluttered end of the alignments. This function, therefore, will not affect
         already correctly formatted alignments, because these will already have sequences of the same length (padded
@@ -174,31 +657,19 @@ class AlignmentFasta:
 
         Parameters
         ----------
-        filepath : str
-            The path to the fasta file that will be preformatted.
+        sequences : dict
+            The dictionary that contains the read (ascii encoded) sequences of the alignment.
 
         Returns
         -------
-        None
+        The dictionary with all sequences cut to the length of the shortest sequence.
         """
 
-        with open(filepath, 'r+') as file:
-            lines = file.readlines()
-
-            # get the lines that are the sequences
-            sequences = [line for line in lines if not line.startswith('>')]
+        # get the shortest sequence length
+        min_seq_length = min(len(seq) for seq in sequences.values())
 
-            # get the shorted sequence length
-            min_seq_length = min([len(seq) for seq in sequences])
-
-            # cut the appropriate lines (sequence lines) to the respective length and write everything to the file
-            for index, line in enumerate(lines):
-                if not line.startswith('>'):
-                    lines[index] = line[:min_seq_length-1] + '\n'
-
-            file.seek(0)
-            file.writelines(lines)
-            file.truncate()
+        # cut all sequences to the respective length
+        return {header: seq[:min_seq_length] for header, seq in sequences.items()}
 
     def write_file(self, path: str) -> None:
         """
@@ -214,25 +685,46 @@ class AlignmentFasta:
         -------
         None
         """
-        assert path.endswith('.fa') or path.endswith('.fasta'), 'Can only write into a fasta file.'
+        if not path.lower().endswith(FASTA_EXTENSIONS):
+            raise ValueError(f'Can only write into a fasta file: {path}')
 
-        # check if the file already exists, if not create a new empty file
-        if not os.path.isfile(path):
-            with open(path, 'w') as _:
-                pass
+        '''Split the sequences into blocks of 60 characters to assure a better readability of the generated fasta 
+        file. The newlines are inserted into the whole matrix at once: the full blocks get a newline column appended 
+        and the shorter last block of every sequence is followed by a single newline.'''
+        num_rows = self.matrix.shape[0]
+        num_blocks, remainder = divmod(self.matrix.shape[1], LINE_WIDTH)
 
-        # we now know that the file must be existing
-        with open(path, 'w') as file:
-            # iterate over all headers and their respective sequence
-            for header, sequence in self.sequences.items():
-                file.write(f'>{header}')
+        blocks = self.matrix[:, :num_blocks * LINE_WIDTH].reshape(num_rows, num_blocks, LINE_WIDTH)
+        newlines = np.full((num_rows, num_blocks, 1), NEWLINE_BYTE, dtype=np.uint8)
+        lines = np.concatenate([blocks, newlines], axis=2).reshape(num_rows, -1)
 
-                '''Split the sequence into blocks of 60 characters to assure a better readability of the 
-                generated fasta file.'''
+        # an empty sequence is written as an empty line
+        last_newline = np.full((num_rows, 1 if remainder or not num_blocks else 0), NEWLINE_BYTE, dtype=np.uint8)
+        lines = np.concatenate([lines, self.matrix[:, num_blocks * LINE_WIDTH:], last_newline], axis=1)
 
-                file.write('\n')
-                file.write('\n'.join(sequence[i:i + 60] for i in range(0, len(sequence), 60)))
-                file.write('\n')
+        output = []
+
+        # iterate over all headers and their respective wrapped sequence and collect the encoded records
+        for header, row in zip(self.ids, lines):
+            output.append(b'>' + header.encode('utf-8') + b'\n')
+            output.append(memoryview(row))
+
+        '''The whole alignment is written at once into a sibling temporary file, which then atomically replaces the 
+        target, so that an existing file is never left empty or half written if the process is interrupted. If the 
+        write fails, the temporary file is removed again.'''
+        tmp_path = f'{path}.tmp'
+
+        # the file is opened outside of the try block, because there is nothing to remove if the open already fails
+        file = open(tmp_path, 'wb')
+
+        try:
+            with file:
+                file.write(b''.join(output))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+        os.replace(tmp_path, path)
 
     @staticmethod
     def preprocess_directory(path: str) -> None:
@@ -254,20 +746,71 @@ class AlignmentFasta:
         None
         """
 
-        alignment_list = AlignmentFasta.read_directory(path)  # get all alignments from the directory
+        # get the name of the folder to know where the file came from
+        folder_name = os.path.basename(os.path.normpath(path))
+
+        filepaths = list(AlignmentFasta.__iter_fasta_paths(path))
+
+        '''
+        The files are independent of each other, so every file is processed in its own worker process. Multiple files
+        are handed to a worker at once to keep the communication overhead between the processes low. Processes are
+        used instead of threads, because most of the work per file (e.g. calulate_identity()) holds the GIL, and the
+        parallel numba kernel must not be called from several threads at once. Every worker limits numba to a single
+        thread, because the processes already use all cores.
+        '''
+        chunksize = max(1, len(filepaths) // (4 * (os.cpu_count() or 1)))
+
+        with ProcessPoolExecutor(initializer=AlignmentFasta._init_preprocess_worker) as executor:
+            # consume the results, so that errors in the workers are raised here
+            for _ in executor.map(AlignmentFasta._preprocess_file, filepaths, itertools.repeat(folder_name),
+                                  range(len(filepaths)), chunksize=chunksize):
+                pass
+
+    @staticmethod
+    def _init_preprocess_worker() -> None:
+        """
+        Function that is called once in every worker process of preprocess_directory(). It limits the parallel numba
+        kernel to one thread, otherwise every worker would start a thread per core and the cores would be
+        oversubscribed. It is not name mangled, so that it can be pickled.
 
-        folder_name = path.split('\\')[-1]  # get the name of the folder to know where the file came from
+        Returns
+        -------
+        None
+        """
 
-        # iterate over all alignments, delete their gaped columns and save them
-        for index, alignment in enumerate(alignment_list):
-            alignment.__delete_unusable_columns()
-            id_num = calulate_identity(alignment) #calculate identity
-            alignment.write_file(f'processed\\{folder_name}_{id_num}_processed_{index}.fasta')
+        if numba is not None:
+            numba.set_num_threads(1)
+
+    @staticmethod
+    def _preprocess_file(filepath: str, folder_name: str, index: int) -> None:
+        """
+        Function that preprocesses a single fasta file. It reads in the alignment, deletes its gaped columns and saves
+        it in the directory called "processed". It is used by preprocess_directory() as the task of a worker process
+        and is therefore not name mangled, so that it can be pickled.
+
+        Parameters
+        ----------
+        filepath : str
+            The path to the fasta file that should be processed.
+        folder_name : str
+            The name of the folder the file came from.
+        index : int
+            The index of the file in its folder, used to get a unique filename.
+
+        Returns
+        -------
+        None
+        """
+
+        alignment = AlignmentFasta.read_file(filepath)
+        alignment.__delete_unusable_columns()
+        id_num = calulate_identity(alignment) #calculate identity
+        alignment.write_file(os.path.join('processed', f'{folder_name}_{id_num}_processed_{index}.fasta'))
 
     def __delete_unusable_columns(self) -> None:
         """
-        Private function that deletes all columns that contain unusable columns. For the operation a pandas dataframe is
-        used, because it already implements certain functions in a time efficient way.
+        Private function that deletes all columns that contain unusable columns. The operation works directly on the
+        byte matrix of the alignment, so that all columns can be checked in a single vectorized pass.
 
         Unusable columns contain following characters:
             - '-'
@@ -279,31 +822,23 @@ class AlignmentFasta:
         None
         """
 
-        # transform the strings to lists of characters
-        sequence_dict = self.sequences
-
-        for key in sequence_dict.keys():
-            sequence_dict[key] = list(sequence_dict[key])
-
-        # work with a pandas dataframe to do certain actions fast
-        seq_df = pd.DataFrame.from_dict(sequence_dict, orient='index')
-        seq_df = seq_df.loc[:, ~(seq_df == '-').any()]  # delete all columns with a gap
-        seq_df = seq_df.loc[:, ~(seq_df == '*').any()]  # delete all columns with a *
-        seq_df = seq_df.loc[:, ~(seq_df == 'X').any()]  # delete all columns with an 'X'
+        # a column is kept only if none of its residues is a gap, a '*' or an 'X', this was determined on loading
+        # compress is used instead of boolean indexing, because it keeps the matrix C-contiguous
 
-        # convert the dataframe back to a dictionary of lists
-        sequence_dict = seq_df.T.to_dict('list')
+        '''The matrix is not assigned through its setter, because the mask and the histogram do not have to be 
+        recomputed: all remaining columns are usable and only the deleted columns are dropped from the histogram.'''
+        self.__matrix = self.__matrix.compress(self.__keep_columns, axis=1)
 
-        # convert the dictionary of lists to a typical dictionary of strings
-        for key in sequence_dict.keys():
-            sequence_dict[key] = ''.join(sequence_dict[key])#
+        if self.__column_histogram is not None:
+            self.__column_histogram = self.__column_histogram.compress(self.__keep_columns, axis=1)
 
-        # fix the processed alignment
-        self.sequences = sequence_dict
+        self.__keep_columns = np.ones(self.__matrix.shape[1], dtype=np.bool_)
+        self.__sequences = None  # the dictionary view has to be rebuilt from the processed matrix
 
 
 def main():
-    AlignmentFasta.preprocess_directory('Data\\Bacteroidetes_Alphaproteobacteria_Gammaproteobacteria_priest_2021')
+    path = os.path.join('Data', 'Bacteroidetes_Alphaproteobacteria_Gammaproteobacteria_priest_2021')
+    AlignmentFasta.preprocess_directory(path)
     return None
 
 
@@ -0,0 +1,53 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+# distutils: extra_compile_args = -O3 -march=native
+"""
+Optional compiled kernels for the preprocessing of alignments. If this module is not compiled, Fasta.py falls back to
+the equivalent numpy implementations.
+
+Compile it in place with:
+
+cythonize -i _fasta_kernels.pyx
+"""
+import numpy as np
+
+from libc.stdint cimport uint8_t
+
+# byte values of the residues that make a column unusable, the same as in Fasta.py
+cdef enum:
+    GAP_BYTE = 45  # '-'
+    STOP_BYTE = 42  # '*'
+    UNKNOWN_BYTE = 88  # 'X'
+
+
+cpdef usable_column_mask(const uint8_t[:, ::1] seq_matrix):
+    """
+    Function that computes which columns of an alignment contain no unusable residues ('-', '*' or 'X').
+
+    The matrix is walked row by row, so that the memory is read contiguously and the inner loop over the columns can be
+    vectorized by the compiler. The GIL is released during the loop.
+
+    Parameters
+    ----------
+    seq_matrix : uint8_t[:, ::1]
+        The C-contiguous (num_of_sequences x seq_length) byte matrix of the alignment.
+
+    Returns
+    -------
+    A boolean numpy array that is True for every column that should be kept.
+    """
+    cdef Py_ssize_t num_rows = seq_matrix.shape[0]
+    cdef Py_ssize_t num_columns = seq_matrix.shape[1]
+    cdef Py_ssize_t i, j
+    cdef uint8_t residue
+
+    keep_columns = np.ones(num_columns, dtype=np.bool_)
+    cdef uint8_t[::1] keep = keep_columns.view(np.uint8)
+
+    # the loop touches no Python objects, so other threads can run while the mask is computed
+    with nogil:
+        for i in range(num_rows):
+            for j in range(num_columns):
+                residue = seq_matrix[i, j]
+                keep[j] &= (residue != GAP_BYTE) & (residue != STOP_BYTE) & (residue != UNKNOWN_BYTE)
+
+    return keep_columns
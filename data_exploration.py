@@ -9,14 +9,14 @@ def print_all_alignments(path: str) -> None:
     for filename in os.listdir(path):
         assert filename.endswith('.fa')
 
-        with open(f'{path}\\{filename}', 'r') as file:
+        with open(os.path.join(path, filename), 'r') as file:
             alignment = AlignIO.read(file, 'fasta')
 
             print(f'{filename:<12}: {alignment.get_alignment_length():<4} aa, {len(alignment)} sequences')
 
 
 def print_al():
-    with open('Data\\L.fa') as file:
+    with open(os.path.join('Data', 'L.fa')) as file:
         al = AlignIO.read(file, 'fasta')
         i = 0
 
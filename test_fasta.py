@@ -0,0 +1,222 @@
+import itertools
+import numpy as np
+import pytest
+
+import Fasta
+
+
+def random_matrix(num_rows: int, num_columns: int, seed: int = 0) -> np.ndarray:
+    """
+    Function that generates a random ascii alignment matrix that contains amino acids, unusable residues and the '?'
+    given by MEGAN.
+    """
+    alphabet = np.frombuffer(b'ACDEFGHIKLMNPQRSTVWY-*X?', dtype=np.uint8)
+    probabilities = [0.96 / 20] * 20 + [0.01] * 4
+
+    return np.random.default_rng(seed).choice(alphabet, size=(num_rows, num_columns), p=probabilities)
+
+
+@pytest.mark.parametrize('seq_length', [0, 1, 11, 12, 13, 1000, 1001])
+def test_pack_unpack_round_trip(seq_length):
+    codes = Fasta.encode_residues(random_matrix(5, seq_length))
+    packed = Fasta.pack_residues(codes)
+
+    assert packed.dtype == np.uint64
+    assert packed.shape == (5, -(-seq_length // Fasta.RESIDUES_PER_WORD))
+    assert np.array_equal(Fasta.unpack_residues(packed, seq_length), codes)
+
+
+@pytest.mark.parametrize('seq_length', [1, 11, 12, 13, 1000, 1001])
+def test_packed_usable_column_mask(seq_length):
+    seq_matrix = random_matrix(5, seq_length, seed=seq_length)
+    packed = Fasta.pack_residues(Fasta.encode_residues(seq_matrix))
+
+    assert np.array_equal(Fasta.packed_usable_column_mask(packed, seq_length), Fasta.usable_column_mask(seq_matrix))
+
+
+def test_alignment_packed_residues():
+    alignment = Fasta.AlignmentFasta({'a': 'AC-D?', 'b': 'ACXDY'})
+    codes = Fasta.unpack_residues(alignment.packed_residues(), alignment.seq_length)
+
+    assert codes.tolist() == [[0, 1, Fasta.UNUSABLE_CODE, 2, Fasta.OTHER_CODE], [0, 1, Fasta.UNUSABLE_CODE, 2, 19]]
+
+
+def test_uneven_sequence_lengths_are_rejected():
+    with pytest.raises(ValueError):
+        Fasta.AlignmentFasta({'a': 'ABC', 'b': 'DE', 'c': 'FGHI'})
+
+
+@pytest.mark.parametrize('arguments', [
+    {'sequences': {}},
+    {},
+    {'ids': ['a']},
+    {'matrix': np.zeros((1, 3), dtype=np.uint8)},
+])
+def test_missing_alignment_data_is_rejected(arguments):
+    with pytest.raises(ValueError):
+        Fasta.AlignmentFasta(**arguments)
+
+
+def test_validate():
+    Fasta.AlignmentFasta({'a': 'AC', 'b': 'AD'}).validate()
+
+    with pytest.raises(ValueError):
+        Fasta.AlignmentFasta(ids=['a', 'a'], matrix=np.zeros((2, 3), dtype=np.uint8)).validate()
+
+    with pytest.raises(ValueError):
+        Fasta.AlignmentFasta(ids=['a'], matrix=np.zeros((2, 3), dtype=np.uint8)).validate()
+
+
+def brute_force_residue_pairs(alignment: Fasta.AlignmentFasta) -> np.ndarray:
+    """
+    Function that counts the amino acid pairs of the usable columns by going over every pair of sequences.
+    """
+    codes = Fasta.encode_residues(alignment.matrix)
+    pairs = np.zeros((len(Fasta.AMINO_ACIDS), len(Fasta.AMINO_ACIDS)), dtype=np.int64)
+
+    for column in np.nonzero(alignment.keep_columns)[0]:
+        for first, second in itertools.combinations(codes[:, column], 2):
+            if first >= len(Fasta.AMINO_ACIDS) or second >= len(Fasta.AMINO_ACIDS):
+                continue
+
+            pairs[first, second] += 1
+            if first != second:
+                pairs[second, first] += 1
+
+    return pairs
+
+
+def test_count_residue_pairs():
+    alignment = Fasta.AlignmentFasta(ids=[str(i) for i in range(7)], matrix=random_matrix(7, 500, seed=3))
+    expected = brute_force_residue_pairs(alignment)
+
+    assert np.array_equal(Fasta.count_residue_pairs(alignment), expected)
+
+    # the deletion reuses the mask and slices the histogram, which must give the same counts
+    alignment._AlignmentFasta__delete_unusable_columns()
+
+    assert alignment.keep_columns.all()
+    assert np.array_equal(Fasta.count_residue_pairs(alignment), expected)
+
+
+def test_column_histogram_after_deletion():
+    alignment = Fasta.AlignmentFasta(ids=[str(i) for i in range(7)], matrix=random_matrix(7, 500, seed=4))
+    alignment.column_histogram  # build the histogram before the deletion, so it is sliced instead of rebuilt
+    alignment._AlignmentFasta__delete_unusable_columns()
+
+    rebuilt = Fasta.AlignmentFasta(ids=alignment.ids, matrix=alignment.matrix)
+
+    assert np.array_equal(alignment.column_histogram, rebuilt.column_histogram)
+
+
+def test_assigning_the_matrix_updates_the_mask():
+    alignment = Fasta.AlignmentFasta({'a': 'AC-D', 'b': 'ACDD'})
+    alignment.column_histogram
+
+    alignment.matrix = np.frombuffer(b'A-CX', dtype=np.uint8).reshape(2, 2)
+
+    assert alignment.keep_columns.tolist() == [True, False]
+    assert alignment.sequences == {'a': 'A-', 'b': 'CX'}
+    assert alignment.column_histogram.shape == (Fasta.NUM_CODES, 2)
+
+    # the length of the initializer is kept, calulate_identity() divides by it
+    assert alignment.seq_length == 4
+
+    alignment._AlignmentFasta__delete_unusable_columns()
+
+    assert alignment.sequences == {'a': 'A', 'b': 'C'}
+
+
+def test_write_file_into_a_missing_directory(tmp_path):
+    alignment = Fasta.AlignmentFasta({'a': 'ACD'})
+
+    # the error of the failed open must not be replaced by one of the cleanup
+    with pytest.raises(FileNotFoundError):
+        alignment.write_file(str(tmp_path / 'missing' / 'out.fasta'))
+
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize('content, expected', [
+    # spaces in the header are replaced, non-ASCII headers are read as UTF-8
+    ('>sp P12345 Protéine α \nACD\n>b\nACD\n'.encode('utf-8'), {'sp_P12345_Protéine_α': 'ACD', 'b': 'ACD'}),
+    # CRLF line endings
+    (b'>a\r\nACD\r\n>b\r\nAC-\r\n', {'a': 'ACD', 'b': 'AC-'}),
+    # records split over multiple lines
+    (b'>a\nAC\nDE\nF\n>b\nACDEF\n', {'a': 'ACDEF', 'b': 'ACDEF'}),
+    # the fluttered ends are cut to the shortest sequence
+    (b'>a\nACDEF\n>b\nACD\n>c\nACDE\n', {'a': 'ACD', 'b': 'ACD', 'c': 'ACD'}),
+    # no newline after the last sequence
+    (b'>a\nACD\n>b\nAC*', {'a': 'ACD', 'b': 'AC*'}),
+])
+@pytest.mark.parametrize('from_directory', [False, True])
+def test_read_fasta(tmp_path, content, expected, from_directory):
+    (tmp_path / 'alignment.fasta').write_bytes(content)
+
+    if from_directory:
+        [alignment] = Fasta.AlignmentFasta.read_directory(str(tmp_path))
+    else:
+        alignment = Fasta.AlignmentFasta.read_file(str(tmp_path / 'alignment.fasta'))
+
+    assert alignment.sequences == expected
+    assert alignment.matrix.shape == (len(expected), len(next(iter(expected.values()))))
+
+
+@pytest.mark.parametrize('seq_length', [0, 1, 59, 60, 61, 120, 121])
+def test_write_file(tmp_path, seq_length):
+    ids = ['a', 'sp P1 été', 'c']
+    matrix = random_matrix(len(ids), seq_length, seed=seq_length)
+    alignment = Fasta.AlignmentFasta(ids=ids, matrix=matrix)
+    path = tmp_path / 'alignment.fasta'
+
+    alignment.write_file(str(path))
+
+    # the output is the same as the one of the former line by line wrapping of the sequences
+    expected = ''.join('>' + header + '\n' + '\n'.join(seq[i:i + 60] for i in range(0, len(seq), 60)) + '\n'
+                       for header, seq in alignment.sequences.items())
+    assert path.read_bytes() == expected.encode('utf-8')
+
+    read = Fasta.AlignmentFasta.read_file(str(path))
+
+    assert read.ids == [header.replace(' ', '_') for header in ids]
+    assert np.array_equal(read.matrix, matrix)
+
+
+# empty alignments, a single column and a width that is not a multiple of the block size of the parallel kernel
+MASK_SHAPES = [(0, 5), (3, 0), (5, 1), (4, 2 * Fasta.PARALLEL_MASK_BLOCK + 7)]
+
+
+@pytest.mark.parametrize('shape', MASK_SHAPES)
+def test_compiled_usable_column_mask(shape):
+    fasta_kernels = pytest.importorskip('_fasta_kernels')
+    matrix = random_matrix(*shape, seed=5)
+
+    mask = fasta_kernels.usable_column_mask(matrix)
+
+    assert mask.dtype == np.bool_
+    assert np.array_equal(mask, ~np.isin(matrix, Fasta.UNUSABLE_RESIDUES).any(axis=0))
+
+
+@pytest.mark.skipif(Fasta.numba is None, reason='numba is not installed')
+@pytest.mark.parametrize('shape', MASK_SHAPES)
+def test_parallel_usable_column_mask(shape):
+    matrix = random_matrix(*shape, seed=6)
+
+    mask = Fasta._parallel_usable_column_mask(matrix)
+
+    assert mask.dtype == np.bool_
+    assert np.array_equal(mask, ~np.isin(matrix, Fasta.UNUSABLE_RESIDUES).any(axis=0))
+
+
+@pytest.mark.parametrize('content', [b'', b'\n\n', b'ACD\nACD\n'])
+@pytest.mark.parametrize('from_directory', [False, True])
+def test_read_fasta_without_sequences(tmp_path, content, from_directory):
+    path = tmp_path / 'empty.fasta'
+    path.write_bytes(content)
+
+    # both read paths reject the file with the same error
+    with pytest.raises(ValueError, match='empty.fasta'):
+        if from_directory:
+            Fasta.AlignmentFasta.read_directory(str(tmp_path))
+        else:
+            Fasta.AlignmentFasta.read_file(str(path))